@@ -9,7 +9,55 @@ __all__ = [
 ]
 
 import numpy as np
-from scipy.spatial.distance import cdist
+from scipy.spatial import cKDTree
+
+# Numba is optional - when available the numeric controller core is
+# JIT-compiled for sub-millisecond control latency, otherwise the plain
+# numpy implementation is used.
+try:
+    from numba import njit
+except ImportError:
+    njit = lambda func: func
+
+@njit
+def _pure_pursuit_core(path, cumlen, idx_shortest, x, y, theta, la_dis,
+                       min_r, vel, wheel_distance, is_right):
+    ''' Numeric core of the pure pursuit controller (free function of
+    plain arrays and scalars only, so that it can be JIT-compiled).
+    @param[in]  cumlen          cumulative arc length along path, [N].
+    @param[in]  idx_shortest    index of path point closest to (x,y).
+    Returns (vel, vl, vr) with the possibly adapted target velocity. '''
+    # Resolve the look ahead distance along the path by binary search
+    # in the precomputed cumulative arc length.
+    n = path.shape[0]
+    target = cumlen[idx_shortest] + la_dis
+    idx_shortest = int(np.searchsorted(cumlen, target))
+    if idx_shortest > n-1:
+        idx_shortest = n-1
+    # From goal point --> vehicle action (velocity & steering vector).
+    svx = path[idx_shortest,0] - x
+    svy = path[idx_shortest,1] - y
+    # New orientation for the car.
+    ori = np.arctan2(svy, svx)
+    # Compute omega (pure pursuit geometry).
+    l = np.sqrt(svx*svx + svy*svy)
+    al = (np.pi/2) - (ori - theta)
+    # Complementary of current orientation and desired orientation
+    xL = l*np.sin(al)
+    yL = l*np.cos(al)
+    # Clamp yL branchlessly away from zero, as the goal point may be
+    # exactly colinear with the current heading; the huge resulting
+    # radius then simply means driving straight.
+    yL = np.copysign(max(abs(yL), 1e-9), yL)
+    r = (xL**2)/(2*yL) + (yL/2)
+    r = np.sign(r)*max(abs(r), min_r)
+    if is_right and y < (-4.65*x-0.8):
+        vel = 0.065
+    if is_right and y > (-4.65*x-0.8):
+        r = -min_r
+        vel = 0.275
+    tau = vel/r
+    return vel, vel-0.5*tau*wheel_distance, vel+0.5*tau*wheel_distance
 
 class Controller(object):
     def __init__(self,direction,path,wheel_distance,
@@ -25,7 +73,14 @@ class Controller(object):
         @param[in]  vel             output velocity as PP merely controls
                          the steering angle [m/s].'''
         self.direction = direction
-        self.path = path
+        self.path = np.asarray(path, dtype=np.float64)
+        # Precompute cumulative arc length along the (static) path, so
+        # that the look ahead point can be found by binary search.
+        seg = np.diff(self.path, axis=0)
+        seg_len = np.sqrt(np.sum(seg*seg, axis=1))
+        self.path_cumlen = np.concatenate((np.zeros(1), np.cumsum(seg_len)))
+        # Spatial index over the (static) path for nearest-point queries.
+        self._path_tree = cKDTree(self.path)
         self.wheel_distance = wheel_distance
         self.adm_error = adm_error
         self.la_dis = la_dis
@@ -53,40 +108,14 @@ class Controller(object):
         for i in range(self.n_hist):
             if(self.theta_hist[i]>self.right_angle):
                 exit=False
-        if(exit): 
+        if(exit):
             return 0,0
-        # Predict future point location.
-        actual = np.zeros((1,2))
-        #future = np.zeros((1,2))
-        actual[0,0]=self.x
-        actual[0,1]=self.y
-        dist_all = cdist(self.path,actual,'euclidean')
-        idx_shortest = np.where(dist_all==np.min(dist_all))
-        idx_shortest = idx_shortest[0]
-        projected_pt = self.path[idx_shortest[0],:]
-        distance = 0
-        while(distance < self.la_dis and idx_shortest<len(self.path)-1):
-            distance += np.linalg.norm(self.path[idx_shortest+1,:]-self.path[idx_shortest,:])
-            idx_shortest += 1
-        idx_next = idx_shortest
-        goal = self.path[idx_next,:]
-        # From goal point --> vehicle action (velocity & steering vector).
-        sv = (goal[0,0]-actual[0,0],
-              goal[0,1]-actual[0,1]) #Steering_vector
-        # New orientation for the car.
-        ori = np.arctan2(sv[1],sv[0])
-        # Compute omega (pure pursuit geometry).
-        l = np.linalg.norm(sv)
-        al = (np.pi/2) - (ori - self.theta)
-        # Complementary of current orientation and desired orientation
-        xL = l*np.sin(al)
-        yL = l*np.cos(al)
-        r = (xL**2)/(2*yL) + (yL/2)
-        r = np.sign(r)*max(abs(r), self.min_r)
-        if(self.direction=='R' and self.y<(-4.65*self.x-0.8)):
-            self.vel = 0.065
-        if(self.direction=='R' and self.y>(-4.65*self.x-0.8)):
-            r=-self.min_r
-            self.vel = 0.275
-        tau = self.vel/r
-        return (self.vel-0.5*tau*self.wheel_distance),(self.vel+0.5*tau*self.wheel_distance)
+        # Query the closest path point in the prebuilt spatial index and
+        # delegate the actual numerics to the (JIT-compilable) core.
+        _, idx_shortest = self._path_tree.query((self.x, self.y))
+        self.vel, vl, vr = _pure_pursuit_core(
+            self.path, self.path_cumlen, int(idx_shortest),
+            self.x, self.y, self.theta,
+            self.la_dis, self.min_r, self.vel,
+            self.wheel_distance, self.direction=='R')
+        return vl, vr
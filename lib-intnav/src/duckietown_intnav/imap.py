@@ -27,11 +27,18 @@ IMAP_DIS_LANE = 0.22                 # One lane width (between yellow & white) [
 IMAP_DIS_YELLOW = 0.025              # Half width of yellow line [m]. 
 IMAP_DIS_YEL_DIS = 0.03              # Distance between yellow line segments [m]. 
 
-IMAP_COLORS = {'white_line': (255,255,255), 
-               'lane': (130,130,130), 
+IMAP_COLORS = {'white_line': (255,255,255),
+               'lane': (130,130,130),
                'red_line': (0,0,255),
                'yellow_line': (0,255,255)}
 
+def _rotate_rect(rect, x, y, angle):
+    ''' Rotate the given rectangle corner points [4x2] by angle [rad]
+    and shift them by the (x,y) offset. '''
+    c, s = np.cos(angle), np.sin(angle)
+    R = np.array([[c, -s], [s, c]])
+    return np.dot(rect, R) + np.array([x, y])
+
 class IMap(object):
 
     # Structure-based encodings.
@@ -45,6 +52,15 @@ class IMap(object):
     v_trajectory = 21
     v_path = 22
 
+    # Fixed attribute layout - avoids the per-instance dict and speeds
+    # up attribute access on the hot visualization/transform paths.
+    __slots__ = ('resolution', '_s', '_wl', '_yl',
+                 'data', 'width', 'height', 'data_colored',
+                 '_origin_p', '_inv_res', '_origin_u', '_origin_v',
+                 'special_points', '_pre_image', '_vis_scratch',
+                 '_vis_point_rad', '_vis_car_w', '_vis_car_h',
+                 '_vis_car_rect', '_pre_trajectory', '_pre_path')
+
     def __init__(self, itype, resolution=0.005, 
                 vis_point_rad=0.001,vis_car_width=0.07, vis_car_height=0.05): 
         ''' iMap class initialization: Build map of given type and given 
@@ -56,30 +72,27 @@ class IMap(object):
         # According to the duckietown norms the red line height is exactly 
         # equal to the width of the white line. 
         self.resolution = resolution
-        s = int((IMAP_DIS_WHITE
+        # Precompute the geometry constants once as instance fields.
+        s = self._s = int((IMAP_DIS_WHITE
             + IMAP_DIS_YELLOW/2
-            + IMAP_DIS_LANE)/resolution) 
-        self.data, self.width, self.height = IMap.create_data_from_type(itype, 
+            + IMAP_DIS_LANE)/resolution)
+        self._wl = int(IMAP_DIS_WHITE/resolution)
+        self._yl = int(IMAP_DIS_YELLOW/2/resolution)
+        base, self.width, self.height = IMap.create_data_from_type(itype,
                                                                 self.resolution)
-        self.data = np.flip(self.data, 1)
-        # Build colored map representation. 
-        self.data_colored = np.zeros((self.width, self.height, 3), dtype=np.uint8)
-        color_dict = {IMap.v_str: 'lane', 
-                      IMap.v_whi: 'white_line', 
-                      IMap.v_red: 'red_line', 
-                      IMap.v_yel: 'yellow_line'}
-        for i in range(self.width): 
-            for j in range(self.height): 
-                cell_type = self.data[i][j]
-                if cell_type == IMap.v_env:
-                    continue
-                classifier = color_dict[cell_type]
-                colors = IMAP_COLORS[classifier]
-                self.data_colored[i,j,0] = colors[0]
-                self.data_colored[i,j,1] = colors[1]
-                self.data_colored[i,j,2] = colors[2]
-        # Set origin position to midth of lower street. 
+        # Copy the (read-only, cached) base array as the map data is
+        # publicly exposed and must stay mutable.
+        self.data = np.array(base)
+        # Build colored map representation by looking up every cell value
+        # in the 256-entry color palette at once (v_env maps to black).
+        self.data_colored = IMAP_COLOR_LUT[self.data]
+        # Set origin position to midth of lower street.
         self._origin_p = (3*s, 2*s)
+        # Cache transform constants (reciprocal resolution and origin as
+        # plain floats), as the world-pixel-transforms are on hot paths.
+        self._inv_res = 1.0/self.resolution
+        self._origin_u = float(self._origin_p[0])
+        self._origin_v = float(self._origin_p[1])
         # Build special points dictionary. 
         self.special_points = {}
         self.special_points['start'] = self.transform_pixel_world(2.5*s,1.5*s)
@@ -92,15 +105,39 @@ class IMap(object):
         # if updated trajectory happens to be the same already visualized
         # trajectory. 
         self._pre_image = None
+        self._vis_scratch = None
         self._vis_point_rad = int(vis_point_rad/self.resolution)
-        self._vis_car_w = int(vis_car_width/self.resolution) 
-        self._vis_car_h = int(vis_car_height/self.resolution) 
+        self._vis_car_w = int(vis_car_width/self.resolution)
+        self._vis_car_h = int(vis_car_height/self.resolution)
+        # Unrotated car rectangle corner points, rotated and shifted to
+        # the current pose in visualize_add_robot.
+        self._vis_car_rect = np.array([(0, 0),
+                                       (self._vis_car_w, 0),
+                                       (self._vis_car_w, self._vis_car_h),
+                                       (0, self._vis_car_h)], dtype=np.float64)
         self._pre_trajectory = []
         self._pre_path = []
         self.visualize_init()
 
+    # Cache of built base maps keyed by (itype, resolution). Only a
+    # handful of distinct configurations is ever requested, while the
+    # construction involves plenty of array allocations.
+    _data_cache = {}
+
     @staticmethod
-    def create_data_from_type(itype, resolution): 
+    def create_data_from_type(itype, resolution):
+        ''' Return (data, width, height) base map for given intersection
+        type and resolution, built once and memoized afterwards. The
+        returned array is marked read-only, copy before mutating ! '''
+        key = (itype, resolution)
+        if key not in IMap._data_cache:
+            data, width, height = IMap._build_data_from_type(itype, resolution)
+            data.setflags(write=False)
+            IMap._data_cache[key] = (data, width, height)
+        return IMap._data_cache[key]
+
+    @staticmethod
+    def _build_data_from_type(itype, resolution):
         s = int((IMAP_DIS_WHITE
             + IMAP_DIS_YELLOW/2
             + IMAP_DIS_LANE)/resolution)
@@ -120,10 +157,12 @@ class IMap(object):
         red_line_img = IMap.v_red*np.ones((s+yl,rh), dtype=np.uint8)
         red_line_img[0:wl,:] = IMap.v_whi
         red_line_img[s-yl:s+yl,:] = IMap.v_yel
-        yellow_line_segements = 2*s/yd
-        for k in range(yellow_line_segements):
-            if k % 2 == 0: 
-                street_img[s-yl:s+yl,2*s-(k+1)*yd:2*s-k*yd] = IMap.v_str
+        # Dash the yellow line: columns belong to segments of width yd
+        # counted from the right street border, every even segment is
+        # blanked out in one masked assignment.
+        seg_idx = (2*s - 1 - np.arange(2*s)) // yd
+        dashed = (seg_idx % 2 == 0) & (seg_idx < 2*s//yd)
+        street_img[s-yl:s+yl,dashed] = IMap.v_str
         # Build up high level structure from basic structure. 
         if itype == "4":
             # Build basic structure. 
@@ -172,17 +211,30 @@ class IMap(object):
             data[4*s-wl:4*s,2*s:4*s] = IMap.v_whi            
         else:
             raise ValueError("Unknown intersection type %s !" % itype)
-        return data, width, height
+        # Flip into the orientation used throughout the package (numpy
+        # vs map convention), contiguously instead of as a strided view.
+        return np.ascontiguousarray(np.flip(data, 1)), width, height
 
     def in_map_pixel(self, u, v): 
         ''' Check whether pixel coordinate is in map. '''
         return 0 <= u < self.width and 0 <= v < self.height
 
-    def in_map_world(self, x, y): 
+    def in_map_world(self, x, y):
         ''' Check whether world coordinate is in map. '''
         u, v = self.transform_world_pixel(x,y)
         return self.in_map_pixel(u,v)
 
+    def is_drivable_pixel(self, u, v):
+        ''' Check whether pixel coordinate lies on the drivable road
+        surface (street or line markings), via cell class lookup. '''
+        return self.in_map_pixel(u,v) and bool(IMAP_DRIVABLE_LUT[self.data[u,v]])
+
+    def is_drivable_world(self, x, y):
+        ''' Check whether world coordinate lies on the drivable road
+        surface (street or line markings). '''
+        u, v = self.transform_world_pixel(x,y)
+        return self.is_drivable_pixel(u,v)
+
     def transform_pixel_world(self, u, v): 
         ''' Transform pixel coordinates to world coordinates. 
         Attention: Due to timing considerations no check is done 
@@ -191,8 +243,8 @@ class IMap(object):
         @param[in]  v       pixel height coordinate, int.
         @param[out] x       world coordiantes [m]. 
         @param[out] y       world coordiantes [m]. '''
-        x = (v - self._origin_p[1])*self.resolution
-        y = (u - self._origin_p[0])*self.resolution
+        x = (v - self._origin_v)*self.resolution
+        y = (u - self._origin_u)*self.resolution
         return float(x), float(y)
 
     def transform_world_pixel(self, x, y): 
@@ -203,8 +255,8 @@ class IMap(object):
         @param[in] y       world coordiantes [m], float. 
         @param[out]  u       pixel width coordinate. 
         @param[out]  v       pixel height coordinate. '''
-        u = y/self.resolution + self._origin_p[0]
-        v = x/self.resolution + self._origin_p[1]
+        u = y*self._inv_res + self._origin_u
+        v = x*self._inv_res + self._origin_v
         return int(u), int(v)
 
     def visualize_add_coord_system(self): 
@@ -218,86 +270,85 @@ class IMap(object):
         self._pre_image[x:u,y:v] = IMap.v_coord_system
         return True
 
-    def visualize_init(self): 
+    def visualize_init(self):
         ''' (Re)Initialize visualization by appending basic
-        structure and basic elements such as coordiate system. '''
-        self._pre_image = np.copy(self.data)
+        structure and basic elements such as coordiate system.
+        The prerendered image buffer is allocated once and refilled
+        in place on reinitialization. '''
+        if self._pre_image is None:
+            self._pre_image = np.empty_like(self.data)
+        np.copyto(self._pre_image, self.data)
         self.visualize_add_coord_system()
 
-    def visualize_add_path(self, path): 
-        ''' Adding path (target-trajectory) to visualization. 
+    def visualize_add_path(self, path):
+        ''' Adding path (target-trajectory) to visualization.
         @param[in]  path            trajectory world coordinates in
                                     format [[x1,y1],[x2,y2],...]. '''
         # Check whether redrawing is necessary, or already visualized
-        # path the same as new path. 
-        succeded = True
-        if len(self._pre_path) == len(path): 
-            diff = 0.0
-            for k in range(len(path)): 
-                pp, pt = self._pre_path[k], path[k]
-                diff += abs(pp[0]-pt[0]) + abs(pp[1]-pt[1])
-            if diff < 1.0:
-                return succeded
-        # Reinitialize visualization in case of "old" trajectories. 
+        # path the same as new path.
+        path = np.asarray(path, dtype=np.float64).reshape(-1,2)
+        if np.array_equal(self._pre_path, path):
+            return True
+        # Reinitialize visualization in case of "old" trajectories.
         self.visualize_init()
-        # Add every trajectory point to visualization. 
-        r = self._vis_point_rad
-        for point in path: 
-            x,y = point
-            u,v = self.transform_world_pixel(x,y)
-            if self.in_map_pixel(u,v): 
-                self._pre_image[u-r:u+r,v-r:v+r] = IMap.v_path
-            else: 
-                warnings.warn("Path point (%f,%f) not in iMap !" % (x,y), Warning)
-                succeded = False
-        # Update pre_rendered trajectory. 
+        # Add every trajectory point to visualization.
+        succeded = self._visualize_add_points(path, IMap.v_path, "Path")
+        # Update pre_rendered trajectory.
         self._pre_path = path
-        return succeded                                    
+        return succeded
 
-    def visualize_add_trajectory(self, trajectory): 
-        ''' Adding trajectory data to visualization. 
+    def visualize_add_trajectory(self, trajectory):
+        ''' Adding trajectory data to visualization.
         @param[in]  trajectory      trajectory world coordinates in
                                     format [[x1,y1],[x2,y2],...]. '''
         # Check whether redrawing is necessary, or already visualized
-        # trajectory the same as new trajectory. 
-        succeded = True
-        if len(self._pre_trajectory) == len(trajectory): 
-            diff = 0.0
-            for k in range(len(trajectory)): 
-                pp, pt = self._pre_trajectory[k], trajectory[k]
-                diff += abs(pp[0]-pt[0]) + abs(pp[1]-pt[1])
-            if diff < 1.0:
-                return succeded
-        # Reinitialize visualization in case of "old" trajectories. 
+        # trajectory the same as new trajectory.
+        trajectory = np.asarray(trajectory, dtype=np.float64).reshape(-1,2)
+        if np.array_equal(self._pre_trajectory, trajectory):
+            return True
+        # Reinitialize visualization in case of "old" trajectories.
         self.visualize_init()
-        # Add every trajectory point to visualization. 
-        r = self._vis_point_rad
-        for point in trajectory: 
-            x,y = point
-            u,v = self.transform_world_pixel(x,y)
-            if self.in_map_pixel(u,v): 
-                self._pre_image[u-r:u+r,v-r:v+r] = IMap.v_trajectory
-            else: 
-                warnings.warn("Trajectory point (%f,%f) not in iMap !" % (x,y), Warning)
-                succeded = False
-        # Update pre_rendered trajectory. 
+        # Add every trajectory point to visualization.
+        succeded = self._visualize_add_points(trajectory, IMap.v_trajectory,
+                                              "Trajectory")
+        # Update pre_rendered trajectory.
         self._pre_trajectory = trajectory
         return succeded
 
+    def _visualize_add_points(self, points, value, label):
+        ''' Mark given points in prerendered image with given encoding
+        value. All points are transformed and drawn in one batched numpy
+        operation, points outside of the map merely raise a warning.
+        @param[in]  points          world coordinates, numpy array [N,2].
+        @param[in]  value           visualization encoding to assign.
+        @param[in]  label           point description for warnings. '''
+        u = (points[:,1]*self._inv_res + self._origin_u).astype(np.intp)
+        v = (points[:,0]*self._inv_res + self._origin_v).astype(np.intp)
+        inside = (u >= 0) & (u < self.width) & (v >= 0) & (v < self.height)
+        r = self._vis_point_rad
+        # Draw all points within a single PIL session (one image
+        # round-trip per redraw) instead of per-point numpy rectangles;
+        # PIL clips drawing at the map borders. Note the coordinate
+        # convention: PIL x/y corresponds to array column/row.
+        img = Image.fromarray(self._pre_image)
+        draw = ImageDraw.Draw(img)
+        if r > 0:
+            for ui,vi in zip(u[inside].tolist(), v[inside].tolist()):
+                draw.rectangle([vi-r, ui-r, vi+r-1, ui+r-1], fill=value)
+        else:
+            draw.point(list(zip(v[inside].tolist(), u[inside].tolist())),
+                       fill=value)
+        self._pre_image[:] = np.asarray(img)
+        for x,y in points[~inside]:
+            warnings.warn("%s point (%f,%f) not in iMap !" % (label,x,y), Warning)
+        return bool(inside.all())
+
     def visualize_add_robot(self, image, pose): 
         ''' Add rectangle as visualization of robot to image (not pre-
         rendered image !) using PIL library. 
         @param[in]  image           image to add robot to.
         @param[in]  pose            robot's pose description in world 
                                     coordinates [m,rad] (x,y,thetha). '''
-        def get_rect(x, y, width, height, angle):
-            rect = np.array([(0, 0), (width, 0), (width, height), (0, height)])
-            R = np.array([[np.cos(theta), -np.sin(theta)],
-                        [np.sin(theta), np.cos(theta)]])
-            offset = np.array([x, y])
-            transformed_rect = np.dot(rect, R) + offset
-            return transformed_rect
-            
         # Check pose information structure.
         if not len(pose) == 3: 
             return image, False
@@ -315,7 +366,7 @@ class IMap(object):
         img = Image.fromarray(image)
         # Draw a rotated rectangle on the image.
         draw = ImageDraw.Draw(img)
-        rect = get_rect(x=vc-w/2, y=uc-h/2, width=w, height=h, angle=theta)
+        rect = _rotate_rect(self._vis_car_rect, vc-w/2, uc-h/2, theta)
         draw.polygon([tuple(p) for p in rect], fill=128)
         # Convert the Image data to a numpy array.
         return np.asarray(img), True
@@ -329,10 +380,15 @@ class IMap(object):
         if pose is None: 
             # Transpose image as numpy convention is different than "norm". 
             return self._pre_image
-        # When additional feature should be drawn, the prerendered image 
+        # When additional feature should be drawn, the prerendered image
         # should not be changed, as it would have to be initialized again.
-        # Therefore, new image is created. 
-        image = np.copy(self._pre_image)
+        # Therefore, a scratch buffer is refilled (allocated once, reused
+        # at every call, i.e. the returned array is overwritten by the
+        # next visualize call !).
+        if self._vis_scratch is None:
+            self._vis_scratch = np.empty_like(self._pre_image)
+        np.copyto(self._vis_scratch, self._pre_image)
+        image = self._vis_scratch
         # Add robots pose if necessary. 
         if len(pose) > 0: 
             image, _ = self.visualize_add_robot(image, pose)
@@ -340,6 +396,17 @@ class IMap(object):
         return image
 
     @staticmethod
-    def imap_types(): 
+    def imap_types():
         ''' Returns implemented imap types. '''
         return ["4","3LR","3SL","3SR"]
+
+# Lookup tables over the uint8 cell codes, built once at import time.
+# Rendering palette: cell code -> color (v_env stays black).
+IMAP_COLOR_LUT = np.zeros((256,3), dtype=np.uint8)
+IMAP_COLOR_LUT[IMap.v_str] = IMAP_COLORS['lane']
+IMAP_COLOR_LUT[IMap.v_whi] = IMAP_COLORS['white_line']
+IMAP_COLOR_LUT[IMap.v_red] = IMAP_COLORS['red_line']
+IMAP_COLOR_LUT[IMap.v_yel] = IMAP_COLORS['yellow_line']
+# Collision classes: cell code -> drivable flag (street and markings).
+IMAP_DRIVABLE_LUT = np.zeros(256, dtype=bool)
+IMAP_DRIVABLE_LUT[[IMap.v_str, IMap.v_whi, IMap.v_red, IMap.v_yel]] = True
@@ -127,8 +127,9 @@ class Main(Node):
             x = detection.pose.pose.pose.position.x
             y = detection.pose.pose.pose.position.y
             z = detection.pose.pose.pose.position.z
-            dist = np.linalg.norm([x,y,z])
-            if dist < 0.95:
+            # Squared distance comparison, the sqrt is unobservable here.
+            dist_sq = x*x + y*y + z*z
+            if dist_sq < 0.95**2:
                 detected.append(detection)
         if len(detected) == 0:
             rospy.logwarn(" No Apriltags closer than 0.95m detected")
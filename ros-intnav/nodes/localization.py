@@ -57,6 +57,7 @@ class Main(Node):
         self.vehicle_frame = rospy.get_param('localization/vehicle_frame')
         self.world_frame = rospy.get_param('localization/world_frame')
         self.olu_rate = rospy.get_param('localization/olu_rate')
+        self.traj_max_poses = rospy.get_param('localization/traj_max_poses', 1000)
         # Build world id to frame dictionary.
         self.direction = None
         self.control_inputs = None
@@ -65,8 +66,11 @@ class Main(Node):
         # Initialize Kalman filter with none (initialization from
         # first pose estimates).
         self.kalman = None
-        self.inits = []
         self.num_init_estimates = rospy.get_param('localization/num_init_estimates')
+        # Preallocated ring buffer for initialization estimates, filled
+        # up measurement by measurement in tag_callback.
+        self.inits = np.empty((self.num_init_estimates, 3))
+        self.num_inits = 0
         self.last_update_time = None
         # Update Kalman filter timer - High-frequent update).
         self.olu_timer = rospy.Timer(rospy.Duration(1.0/float(self.olu_rate)),
@@ -136,9 +140,12 @@ class Main(Node):
             x = detection.pose.pose.pose.position.x
             y = detection.pose.pose.pose.position.y
             z = detection.pose.pose.pose.position.z
-            dist = np.linalg.norm([x,y,z])
-            if dist > 0.95: 
-                rospy.logwarn("Tag %d out of range (dist=%f)" % (tag_id,dist))
+            # Compare squared distances - the sqrt is only needed for
+            # the warning message.
+            dist_sq = x*x + y*y + z*z
+            if dist_sq > 0.95**2:
+                rospy.logwarn("Tag %d out of range (dist=%f)"
+                              % (tag_id,np.sqrt(dist_sq)))
                 continue
             # TF Tree transformations.
             latest = rospy.Time(0)
@@ -161,20 +168,17 @@ class Main(Node):
             return False
         # Update kalman filter (or initialize it if not initialized).
         if self.kalman is None:
-            self.inits.extend(pose_estimates)
-            if len(self.inits) >= self.num_init_estimates:
-                estimates = self.inits[0]
-                for i in range(2, len(self.inits)):
-                    estimates = np.vstack((estimates,self.inits[i]))
+            for estimate in pose_estimates:
+                self.inits[self.num_inits % self.num_init_estimates] = estimate
+                self.num_inits += 1
+            if self.num_inits >= self.num_init_estimates:
                 init_position = np.mean(self.inits, axis=0)
                 init_var = np.var(self.inits, axis=0)
                 self.kalman = KalmanFilter(self.bot_params, init_position, init_var)
                 self.last_update_time = rospy.get_time()
                 rospy.loginfo("Kalman initialized pose ...")
             return True
-        z = pose_estimates[0]
-        for i in range(1, len(pose_estimates)):
-            z = np.hstack((z,pose_estimates[i]))
+        z = np.concatenate(pose_estimates)
         self.kalman.update(z, self.control_inputs,
                            self.process_noise, self.april_noise,
                            rospy.get_time() - self.last_update_time, self.direction)
@@ -206,6 +210,11 @@ class Main(Node):
         path_pose.pose  = pose_stamped.pose.pose
         self.traj.header = pose_stamped.header
         self.traj.poses.append(path_pose)
+        # Bound the trajectory length - otherwise the Path message grows
+        # (and is serialized) without limit over the node lifetime.
+        overflow = len(self.traj.poses) - self.traj_max_poses
+        if overflow > 0:
+            del self.traj.poses[:overflow]
         self.traj_pub.publish(self.traj)
 
     @staticmethod